@@ -1,115 +1,342 @@
+import asyncio
 import functools
 import logging
 import sys
 import types
-import openai
 import os
-from typing import Callable, Optional, Any
-from erin.prompt import format_prompt
+import weakref
+from typing import Callable, Optional, Any, TYPE_CHECKING
+from erin.prompt import format_prompt, format_parameter_values, MAX_PARAMETER_VALUES_LENGTH
 from erin.executor import FunctionExecutor
-from erin.cache import get_cached_code, set_cached_code
+from erin.cache import get_cached_code, set_cached_code, delete_cached_code, get_cache_generation
+from erin.limiter import RateLimiter
 from typing import List, Tuple
 
+if TYPE_CHECKING:
+    # Only for annotations; openai is imported on first use
+    import openai
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
-_openai_client_kwargs = {
-    "api_key": os.getenv("OPENAI_API_KEY"),
-}
+# Clients and settings are created on first use, so importing erin stays cheap
+@functools.cache
+def _client_kwargs() -> dict:
+    kwargs = {
+        "api_key": os.getenv("OPENAI_API_KEY"),
+        # The SDK retries rate limits, 5xx, timeouts and connection errors with
+        # jittered exponential backoff, honoring Retry-After when the server sends it
+        "max_retries": int(os.getenv("OPENAI_MAX_RETRIES", "5")),
+    }
+
+    base_url = os.getenv("OPENAI_BASE_URL")
+    if base_url:
+        kwargs["base_url"] = base_url
+        logger.info("Using custom base_url: %s", base_url)
+    else:
+        logger.info("Using default OpenAI base_url")
+    return kwargs
+
+
+@functools.cache
+def _client() -> "openai.OpenAI":
+    import openai
+
+    client = openai.OpenAI(**_client_kwargs())
+    logger.info("OpenAI client initialized")
+    return client
+
+
+# One pooled async client per event loop, as httpx connections belong to the loop that opened them.
+# Values are (client, closer), the closer being an async generator the loop finalizes on shutdown
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+async def _close_on_shutdown(client: "openai.AsyncOpenAI"):
+    try:
+        yield
+    finally:
+        await client.close()
+        logger.debug("Async OpenAI client closed")
 
-base_url = os.getenv("OPENAI_BASE_URL")
-if base_url:
-    _openai_client_kwargs["base_url"] = base_url
-    logger.info(f"Using custom base_url: {base_url}")
-else:
-    logger.info("Using default OpenAI base_url")
 
-openai_client = openai.OpenAI(**_openai_client_kwargs)
-logger.info("OpenAI client initialized")
+async def _async_client() -> "openai.AsyncOpenAI":
+    """
+    Async client of the running event loop, with a pooled HTTP client so calls reuse keep-alive connections.
+    It is never closed by callers, since shared generations may still use it, but when the loop
+    shuts down its async generators (as asyncio.run does).
+    """
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        import httpx
+        import openai
 
-model = os.getenv("OPENAI_MODEL")
-if model is None:
-    model = "gpt-4o-mini"
-logger.debug(f"Using model: {model}")
+        http_client = openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=100)
+        )
+        client = openai.AsyncOpenAI(http_client=http_client, **_client_kwargs())
+        closer = _close_on_shutdown(client)
+        await closer.__anext__()
+        entry = _async_clients[loop] = (client, closer)
+        logger.info("Async OpenAI client initialized")
+    return entry[0]
 
 
+@functools.cache
+def _model() -> str:
+    model = os.getenv("OPENAI_MODEL")
+    if model is None:
+        model = "gpt-4o-mini"
+    logger.debug("Using model: %s", model)
+    return model
 
 
-class LLMCallable(Callable):
-    function_name = None
-    docstring = None
+class LLMCallable:
+    # __dict__ stays available for the metadata functools.update_wrapper copies from decorated functions
+    __slots__ = ("function_name", "docstring", "_compiled", "_generation", "_pending", "__dict__")
 
     def chat(self, prompt: str, system_prompt: str = None) -> str:
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
-        response = openai_client.chat.completions.create(
-            model=model,
+        response = _client().chat.completions.create(
+            model=_model(),
             messages=messages,
         )
-        logger.info(f"Chat response: {response.choices[0].message.content}")
+        logger.info("Chat response: %s", response.choices[0].message.content)
         return response.choices[0].message.content
 
 
     def __init__(self, function_name, docstring=None):
         self.function_name = function_name
         self.docstring = docstring
+        # Compiled executors keyed by the call's (param_name, param_type) signature
+        self._compiled: dict[Tuple[Tuple[str, str], ...], FunctionExecutor] = {}
+        self._generation = get_cache_generation()
+        # In-flight async generations, so concurrent calls with one signature share a request
+        self._pending: dict[Tuple[Tuple[str, str], ...], asyncio.Future] = {}
 
-    def __call__(self, *args):
-        logger.info(f"Calling function: {self.function_name}, arguments: {args}")
+    def _format_args(self, args) -> List[Tuple[str, str]]:
+        logger.info("Calling function: %s, arguments: %s", self.function_name, args)
         formatted_args: List[Tuple[str, str]] = [
             ((f"arg{i}", type(arg).__name__)) for i, arg in enumerate(args)
         ]
-        logger.debug(f"Formatted arguments: {formatted_args}")
+        logger.debug("Formatted arguments: %s", formatted_args)
+        return formatted_args
 
-        # Check cache first
-        code = get_cached_code(self.function_name, formatted_args)
+    def _get_compiled(self, signature: Tuple[Tuple[str, str], ...]) -> Optional[FunctionExecutor]:
+        generation = get_cache_generation()
+        if self._generation != generation:
+            # clear_cache() was called, so compiled functions are regenerated along with cached code
+            self._compiled.clear()
+            self._generation = generation
+        return self._compiled.get(signature)
 
-        if code is None:
-            # Cache miss: need to generate code using LLM
-            # Prepare parameter values list
-            parameter_values: List[Tuple[str, Any]] = [
-                (f"arg{i}", arg) for i, arg in enumerate(args)
-            ]
-            logger.debug(f"Parameter values: {parameter_values}")
-
-            logger.debug(f"Function documentation: {self.docstring }")
-            prompt = format_prompt(self.function_name, formatted_args, parameter_values, self.docstring)
-            logger.debug(f"Generated prompt length: {len(prompt)} characters")
-
-            logger.info("Calling OpenAI API to generate function code...")
-            try:
-                response = openai_client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "user", "content": prompt},
-                    ],
-                )
-                code = response.choices[0].message.content
-                logger.info(
-                    f"Successfully generated function code, code length: {len(code)} characters"
-                )
-                logger.debug(f"Generated code:\n{code}")
+    def __call__(self, *args):
+        formatted_args = self._format_args(args)
 
-                # Store in cache
-                set_cached_code(self.function_name, formatted_args, code)
-            except Exception as e:
-                logger.error(f"OpenAI API call failed: {e}", exc_info=True)
-                raise
+        signature = tuple(formatted_args)
+        executor = self._get_compiled(signature)
+        if executor is None:
+            executor = self._build_executor(args, formatted_args)
+            self._compiled[signature] = executor
         else:
-            logger.info("Using cached function code")
+            logger.info("Using compiled function")
 
-        executor = FunctionExecutor(self.function_name, code, self.chat)
         logger.info("Executing generated function...")
         try:
             result = executor(*args)
-            logger.info(f"Function executed successfully, return value: {result}")
+            logger.info("Function executed successfully, return value: %s", result)
             return result
         except Exception as e:
-            logger.error(f"Function execution failed: {e}", exc_info=True)
+            logger.error("Function execution failed: %s", e, exc_info=True)
             raise
 
+    async def acall(self, *args):
+        """
+        Asynchronous counterpart of calling the function, generating code with the async client.
+        Calls on one event loop share a connection pool, use erin.gather to run many at once.
+        """
+        return await self._acall(args)
+
+    async def _acall(
+        self,
+        args,
+        limiter: Optional[RateLimiter] = None
+    ):
+        formatted_args = self._format_args(args)
+
+        signature = tuple(formatted_args)
+        executor = self._get_compiled(signature)
+        if executor is None:
+            pending = self._pending.get(signature)
+            if pending is None:
+                pending = asyncio.ensure_future(self._abuild_executor(args, formatted_args, limiter))
+                self._pending[signature] = pending
+                pending.add_done_callback(
+                    functools.partial(self._finish_pending, signature, self._generation)
+                )
+            # Shielded, so a cancelled caller doesn't cancel the generation other callers are waiting on
+            executor = await asyncio.shield(pending)
+        else:
+            logger.info("Using compiled function")
+
+        logger.info("Executing generated function...")
+        try:
+            # Generated code may call the blocking chat(), keep it off the event loop
+            result = await asyncio.to_thread(executor, *args)
+            logger.info("Function executed successfully, return value: %s", result)
+            return result
+        except Exception as e:
+            logger.error("Function execution failed: %s", e, exc_info=True)
+            raise
+
+    def _finish_pending(
+        self,
+        signature: Tuple[Tuple[str, str], ...],
+        generation: int,
+        task: asyncio.Future
+    ) -> None:
+        self._pending.pop(signature, None)
+        # Keep the result even if every caller waiting on it was cancelled, unless the cache was cleared meanwhile
+        if not task.cancelled() and task.exception() is None and generation == get_cache_generation():
+            self._compiled[signature] = task.result()
+
+    def _parameter_values(self, args) -> Tuple[Optional[List[Tuple[str, Optional[str]]]], bool]:
+        # Prepare parameter values list
+        parameter_values: List[Tuple[str, Any]] = [
+            (f"arg{i}", arg) for i, arg in enumerate(args)
+        ]
+        # Large values are left out of the prompt; code generated either way is cached separately
+        formatted_values = format_parameter_values(parameter_values, MAX_PARAMETER_VALUES_LENGTH)
+        include_values = formatted_values is not None
+        logger.debug("Parameter values: %s, included in prompt: %s", parameter_values, include_values)
+        return formatted_values, include_values
+
+    def _make_prompt(
+        self,
+        formatted_args: List[Tuple[str, str]],
+        formatted_values: Optional[List[Tuple[str, Optional[str]]]]
+    ) -> str:
+        logger.debug("Function documentation: %s", self.docstring)
+        prompt = format_prompt(
+            self.function_name,
+            formatted_args,
+            optional_context=self.docstring,
+            formatted_values=formatted_values
+        )
+        logger.debug("Generated prompt length: %s characters", len(prompt))
+        return prompt
+
+    def _response_code(self, response) -> str:
+        code = response.choices[0].message.content
+        logger.info(
+            "Successfully generated function code, code length: %s characters", len(code)
+        )
+        logger.debug("Generated code:\n%s", code)
+        return code
+
+    def _cache_scope(self) -> dict:
+        # Everything besides the signature that shapes the generated code
+        return {
+            "optional_context": self.docstring,
+            "model": _model(),
+            "base_url": _client_kwargs().get("base_url"),
+        }
+
+    def _cached_executor(
+        self,
+        formatted_args: List[Tuple[str, str]],
+        include_values: bool
+    ) -> Optional[FunctionExecutor]:
+        code = get_cached_code(self.function_name, formatted_args, include_values, **self._cache_scope())
+        if code is None:
+            return None
+
+        logger.info("Using cached function code")
+        try:
+            return FunctionExecutor(self.function_name, code, self.chat)
+        except Exception:
+            # Drop unusable code so it is regenerated instead of failing on every run
+            logger.warning("Cached function code failed to compile, regenerating")
+            delete_cached_code(self.function_name, formatted_args, include_values, **self._cache_scope())
+            return None
+
+    def _compile_and_cache(
+        self,
+        formatted_args: List[Tuple[str, str]],
+        include_values: bool,
+        code: str
+    ) -> FunctionExecutor:
+        # Only code that compiles and binds is cached, so a bad response is not persisted
+        executor = FunctionExecutor(self.function_name, code, self.chat)
+        set_cached_code(self.function_name, formatted_args, code, include_values, **self._cache_scope())
+        return executor
+
+    def _build_executor(self, args, formatted_args: List[Tuple[str, str]]) -> FunctionExecutor:
+        formatted_values, include_values = self._parameter_values(args)
+
+        # Check cache first
+        executor = self._cached_executor(formatted_args, include_values)
+        if executor is not None:
+            return executor
+
+        # Cache miss: need to generate code using LLM
+        prompt = self._make_prompt(formatted_args, formatted_values)
+
+        logger.info("Calling OpenAI API to generate function code...")
+        try:
+            response = _client().chat.completions.create(
+                model=_model(),
+                messages=[
+                    {"role": "user", "content": prompt},
+                ],
+            )
+            code = self._response_code(response)
+        except Exception as e:
+            logger.error("OpenAI API call failed: %s", e, exc_info=True)
+            raise
+
+        return self._compile_and_cache(formatted_args, include_values, code)
+
+    async def _abuild_executor(
+        self,
+        args,
+        formatted_args: List[Tuple[str, str]],
+        limiter: Optional[RateLimiter] = None
+    ) -> FunctionExecutor:
+        formatted_values, include_values = self._parameter_values(args)
+
+        # Check cache first; SQLite access blocks, so it runs off the event loop
+        executor = await asyncio.to_thread(self._cached_executor, formatted_args, include_values)
+        if executor is not None:
+            return executor
+
+        # Cache miss: need to generate code using LLM
+        prompt = self._make_prompt(formatted_args, formatted_values)
+
+        if limiter is not None:
+            # Rough estimate of ~4 characters per token, as in the OpenAI cookbook
+            await limiter.acquire(len(prompt) // 4)
+
+        logger.info("Calling OpenAI API to generate function code...")
+        try:
+            client = await _async_client()
+            response = await client.chat.completions.create(
+                model=_model(),
+                messages=[
+                    {"role": "user", "content": prompt},
+                ],
+            )
+            code = self._response_code(response)
+        except Exception as e:
+            logger.error("OpenAI API call failed: %s", e, exc_info=True)
+            raise
+
+        return await asyncio.to_thread(self._compile_and_cache, formatted_args, include_values, code)
+
 
 def erin(func: Optional[Callable] = None, *, name: Optional[str] = None) -> Callable:
     def _decorate(f: Callable):
@@ -120,8 +347,53 @@ def erin(func: Optional[Callable] = None, *, name: Optional[str] = None) -> Call
     return _decorate if func is None else _decorate(func)
 
 
+async def gather(
+    *calls,
+    concurrency: int = 8,
+    max_requests_per_minute: Optional[float] = None,
+    max_tokens_per_minute: Optional[float] = None
+) -> list:
+    """
+    Run several erin calls concurrently and return their results in order.
+
+    Args:
+        calls: (function, arg0, arg1, ...) tuples, where function is an erin callable
+        concurrency: Maximum number of calls in flight at once
+        max_requests_per_minute: Optional OpenAI request budget
+        max_tokens_per_minute: Optional OpenAI token budget (estimated from prompt length)
+
+    Returns:
+        List of results, one per call
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = None
+    if max_requests_per_minute or max_tokens_per_minute:
+        limiter = RateLimiter(max_requests_per_minute, max_tokens_per_minute)
+
+    async def _run(func: LLMCallable, *args):
+        async with semaphore:
+            return await func._acall(args, limiter)
+
+    return await asyncio.gather(*(_run(*call) for call in calls))
+
+
+# One LLMCallable per attribute name, so compiled functions carry across erin.<name> accesses.
+# Emptied when the cache is cleared, after which accesses get fresh objects again
+_llm_registry: dict[str, LLMCallable] = {}
+_llm_registry_generation = get_cache_generation()
+
+
 def __getattr__(name):
-    return LLMCallable(name)
+    global _llm_registry_generation
+    generation = get_cache_generation()
+    if _llm_registry_generation != generation:
+        _llm_registry.clear()
+        _llm_registry_generation = generation
+
+    llm = _llm_registry.get(name)
+    if llm is None:
+        llm = _llm_registry[name] = LLMCallable(name)
+    return llm
 
 
 class _ErinModule(types.ModuleType):
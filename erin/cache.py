@@ -1,50 +1,137 @@
 import hashlib
 import json
 import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
 from typing import List, Tuple, Optional
+from erin.prompt import PROMPT
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# (function_name, parameters, include_values, optional_context, model, base_url)
+CacheKey = Tuple[str, Tuple[Tuple[str, str], ...], bool, Optional[str], Optional[str], Optional[str]]
+
 # In-memory cache: maps cache_key -> function_code
-_cache: dict[str, str] = {}
+_cache: dict[CacheKey, str] = {}
+
+# Generated code depends on the prompt, so persisted entries are invalidated when it changes
+PROMPT_VERSION = hashlib.blake2b(PROMPT.encode('utf-8'), digest_size=16).hexdigest()
+_PROMPT_VERSION_KEY = "__erin_prompt_version__"
+
+# On-disk cache, opened on first use; False once opening has failed or it is disabled
+_db: Optional[sqlite3.Connection | bool] = None
+_db_lock = threading.Lock()
+
+# Bumped by clear_cache(), so functions compiled from earlier code know to regenerate it
+_generation = 0
+
+
+def get_cache_dir() -> str:
+    """Directory of the on-disk cache: $ERIN_CACHE_DIR, or the platform's user cache directory."""
+    cache_dir = os.getenv("ERIN_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+
+    if sys.platform == "win32":
+        base = os.getenv("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "erin")
+
+
+def _db_path() -> str:
+    return os.path.join(get_cache_dir(), "cache.sqlite3")
+
+
+def _get_db() -> Optional[sqlite3.Connection]:
+    global _db
+    if _db is None:
+        # Opened under the lock, so concurrent first calls share one connection and version check
+        with _db_lock:
+            if _db is None:
+                _db = _open_db()
+    return _db or None
+
+
+def _open_db() -> sqlite3.Connection | bool:
+    if os.getenv("ERIN_DISK_CACHE", "1") == "0":
+        logger.info("On-disk cache disabled")
+        return False
+    try:
+        cache_dir = get_cache_dir()
+        os.makedirs(cache_dir, exist_ok=True)
+        db = sqlite3.connect(_db_path(), check_same_thread=False)
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, code TEXT, created REAL)")
+            row = db.execute("SELECT code FROM cache WHERE key = ?", (_PROMPT_VERSION_KEY,)).fetchone()
+            if row is None or row[0] != PROMPT_VERSION:
+                # Entries were generated from a different prompt
+                db.execute("DELETE FROM cache")
+                db.execute(
+                    "INSERT INTO cache (key, code, created) VALUES (?, ?, ?)",
+                    (_PROMPT_VERSION_KEY, PROMPT_VERSION, time.time())
+                )
+        logger.info("Opened on-disk cache in %s", cache_dir)
+        return db
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("On-disk cache unavailable, using in-memory cache only: %s", e)
+        return False
+
+
+def _persistent_key(cache_key: CacheKey) -> str:
+    """Stable string form of a cache key for the on-disk cache."""
+    if orjson is not None:
+        payload = orjson.dumps(cache_key)
+    else:
+        # Same bytes orjson produces, so keys match whether or not it is installed
+        payload = json.dumps(cache_key, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
 
 
 def generate_cache_key(
     function_name: str,
-    parameters: List[Tuple[str, str]]
-) -> str:
+    parameters: List[Tuple[str, str]],
+    include_values: bool = True,
+    optional_context: Optional[str] = None,
+    model: Optional[str] = None,
+    base_url: Optional[str] = None
+) -> CacheKey:
     """
-    Generate a cache key based on function name, parameter names, and parameter types.
+    Generate a cache key based on function name, parameter names and types,
+    and everything else that shapes the generated code.
 
     Args:
         function_name: Name of the function
         parameters: List of (param_name, param_type) tuples
+        include_values: Whether the prompt that generated the code included parameter values
+        optional_context: Context hint (docstring) the code was generated with
+        model: Model the code was generated with
+        base_url: API endpoint the code was generated with
 
     Returns:
-        A hash string representing the cache key
+        A hashable tuple representing the cache key
     """
-    # Create a deterministic representation
     # Keep parameters in original order as parameter position matters for function signature
-    # Create a dictionary representation
-    cache_data = {
-        "function_name": function_name,
-        "parameters": parameters
-    }
-
-    # Convert to JSON string (deterministic)
-    json_str = json.dumps(cache_data, sort_keys=True, ensure_ascii=False)
-
-    # Generate hash
-    hash_obj = hashlib.sha256(json_str.encode('utf-8'))
-    cache_key = hash_obj.hexdigest()
-
-    logger.debug(f"Generated cache key: {cache_key} for function {function_name} with parameters {parameters}")
-    return cache_key
+    return (function_name, tuple(parameters), include_values, optional_context, model, base_url)
 
 
 def get_cached_code(
     function_name: str,
-    parameters: List[Tuple[str, str]]
+    parameters: List[Tuple[str, str]],
+    include_values: bool = True,
+    optional_context: Optional[str] = None,
+    model: Optional[str] = None,
+    base_url: Optional[str] = None
 ) -> Optional[str]:
     """
     Retrieve cached function code if it exists.
@@ -52,26 +139,40 @@ def get_cached_code(
     Args:
         function_name: Name of the function
         parameters: List of (param_name, param_type) tuples
+        include_values: Whether the prompt includes parameter values
+        optional_context: Context hint (docstring) the code was generated with
+        model: Model the code was generated with
+        base_url: API endpoint the code was generated with
 
     Returns:
         Cached function code if found, None otherwise
     """
-    cache_key = generate_cache_key(function_name, parameters)
+    cache_key = generate_cache_key(
+        function_name, parameters, include_values, optional_context, model, base_url
+    )
 
-    if cache_key not in _cache:
-        logger.debug(f"Cache miss for function {function_name} with parameters {parameters}")
-        return None
+    code = _cache.get(cache_key)
+    if code is None:
+        code = _load_from_disk(cache_key)
+        if code is None:
+            logger.debug("Cache miss for function %s with parameters %s", function_name, parameters)
+            return None
+        _cache[cache_key] = code
+        logger.debug("Loaded cached code from disk")
 
-    code = _cache[cache_key]
-    logger.info(f"Cache hit for function {function_name} with parameters {parameters}")
-    logger.debug(f"Retrieved cached code, length: {len(code)} characters")
+    logger.info("Cache hit for function %s with parameters %s", function_name, parameters)
+    logger.debug("Retrieved cached code, length: %s characters", len(code))
     return code
 
 
 def set_cached_code(
     function_name: str,
     parameters: List[Tuple[str, str]],
-    code: str
+    code: str,
+    include_values: bool = True,
+    optional_context: Optional[str] = None,
+    model: Optional[str] = None,
+    base_url: Optional[str] = None
 ) -> None:
     """
     Store function code in cache.
@@ -80,16 +181,104 @@ def set_cached_code(
         function_name: Name of the function
         parameters: List of (param_name, param_type) tuples
         code: The generated function code to cache
+        include_values: Whether the prompt that generated the code included parameter values
+        optional_context: Context hint (docstring) the code was generated with
+        model: Model the code was generated with
+        base_url: API endpoint the code was generated with
     """
-    cache_key = generate_cache_key(function_name, parameters)
+    cache_key = generate_cache_key(
+        function_name, parameters, include_values, optional_context, model, base_url
+    )
     _cache[cache_key] = code
+    _save_to_disk(cache_key, code)
+
+    logger.info("Cached function code for %s with parameters %s", function_name, parameters)
+    logger.debug("Cached code length: %s characters", len(code))
+
+
+def delete_cached_code(
+    function_name: str,
+    parameters: List[Tuple[str, str]],
+    include_values: bool = True,
+    optional_context: Optional[str] = None,
+    model: Optional[str] = None,
+    base_url: Optional[str] = None
+) -> None:
+    """
+    Remove function code from the cache, e.g. when cached code turns out to be unusable.
+
+    Args:
+        function_name: Name of the function
+        parameters: List of (param_name, param_type) tuples
+        include_values: Whether the prompt that generated the code included parameter values
+        optional_context: Context hint (docstring) the code was generated with
+        model: Model the code was generated with
+        base_url: API endpoint the code was generated with
+    """
+    cache_key = generate_cache_key(
+        function_name, parameters, include_values, optional_context, model, base_url
+    )
+    _cache.pop(cache_key, None)
+    _delete_from_disk(cache_key)
+
+    logger.info("Removed cached function code for %s with parameters %s", function_name, parameters)
+
+
+def _load_from_disk(cache_key: CacheKey) -> Optional[str]:
+    db = _get_db()
+    if db is None:
+        return None
+    try:
+        with _db_lock:
+            row = db.execute("SELECT code FROM cache WHERE key = ?", (_persistent_key(cache_key),)).fetchone()
+    except sqlite3.Error as e:
+        logger.warning("Failed to read on-disk cache: %s", e)
+        return None
+    return row[0] if row else None
+
+
+def _save_to_disk(cache_key: CacheKey, code: str) -> None:
+    db = _get_db()
+    if db is None:
+        return
+    try:
+        with _db_lock, db:
+            db.execute(
+                "INSERT OR REPLACE INTO cache (key, code, created) VALUES (?, ?, ?)",
+                (_persistent_key(cache_key), code, time.time())
+            )
+    except sqlite3.Error as e:
+        logger.warning("Failed to write on-disk cache: %s", e)
+
+
+def _delete_from_disk(cache_key: CacheKey) -> None:
+    db = _get_db()
+    if db is None:
+        return
+    try:
+        with _db_lock, db:
+            db.execute("DELETE FROM cache WHERE key = ?", (_persistent_key(cache_key),))
+    except sqlite3.Error as e:
+        logger.warning("Failed to delete from on-disk cache: %s", e)
+
 
-    logger.info(f"Cached function code for {function_name} with parameters {parameters}")
-    logger.debug(f"Cached code length: {len(code)} characters")
+def get_cache_generation() -> int:
+    """Number of times the cache has been cleared in this process."""
+    return _generation
 
 
 def clear_cache() -> None:
-    """Clear all cached function codes."""
+    """Clear all cached function codes, in memory and on disk, and the functions compiled from them."""
+    global _generation
     _cache.clear()
+    _generation += 1
+    # Don't create the cache directory and database just to clear them
+    db = _get_db() if _db is not None or os.path.exists(_db_path()) else None
+    if db is not None:
+        try:
+            with _db_lock, db:
+                db.execute("DELETE FROM cache WHERE key != ?", (_PROMPT_VERSION_KEY,))
+        except sqlite3.Error as e:
+            logger.warning("Failed to clear on-disk cache: %s", e)
     logger.info("Cache cleared")
 
@@ -3,32 +3,36 @@ from typing import Callable
 
 logger = logging.getLogger(__name__)
 
-class FunctionExecutor(Callable):
+class FunctionExecutor:
+    __slots__ = ("func_name", "func_def", "chat_func", "_fn", "_ns")
+
     def __init__(self, func_name: str, func_def: str, chat_func: Callable):
         self.func_name = func_name
         self.func_def = func_def
         self.chat_func = chat_func
-        logger.debug(f"Initializing FunctionExecutor: {func_name}")
-
-    def __call__(self, *args, **kwargs) -> str:
-        logger.debug(f"Executing function {self.func_name}, arguments: args={args}, kwargs={kwargs}")
+        logger.debug("Initializing FunctionExecutor: %s", func_name)
 
-        globals_ = globals().copy()
-        globals_['chat'] = self.chat_func
-
-        logger.debug(f"Code to execute:\n{self.func_def}")
-        logger.debug(f"Calling function {self.func_name} with args={args}, kwargs={kwargs}")
+        # Minimal namespace for the generated code, built once instead of copying module globals
+        self._ns = {"__name__": __name__, "__builtins__": __builtins__, "chat": self.chat_func}
 
+        logger.debug("Code to compile:\n%s", self.func_def)
         try:
-            exec(self.func_def, globals_, globals_)
+            # Compile and bind the generated definition once, calls reuse the function object
+            code_obj = compile(self.func_def, f"<erin:{func_name}>", "exec")
+            exec(code_obj, self._ns)
+            self._fn = self._ns[func_name]
             logger.debug("Function definition executed successfully")
-            globals_['args'] = args
-            globals_['kwargs'] = kwargs
+        except Exception as e:
+            logger.error("Error compiling function: %s", e, exc_info=True)
+            raise
+
+    def __call__(self, *args, **kwargs) -> str:
+        logger.debug("Calling function %s with args=%s, kwargs=%s", self.func_name, args, kwargs)
 
-            exec(f"__result__ = {self.func_name}(*args, **kwargs)", globals_, globals_)
-            result = globals_["__result__"]
-            logger.debug(f"Function call succeeded, result: {result}")
+        try:
+            result = self._fn(*args, **kwargs)
+            logger.debug("Function call succeeded, result: %s", result)
             return result
         except Exception as e:
-            logger.error(f"Error executing function: {e}", exc_info=True)
+            logger.error("Error executing function: %s", e, exc_info=True)
             raise
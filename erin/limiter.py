@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests per minute and tokens per minute.
+    Both budgets refill continuously; a limit of None disables that budget.
+    """
+
+    def __init__(
+        self,
+        max_requests_per_minute: Optional[float] = None,
+        max_tokens_per_minute: Optional[float] = None
+    ):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self._available_requests = max_requests_per_minute or 0.0
+        self._available_tokens = max_tokens_per_minute or 0.0
+        self._last_update = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_update
+        self._last_update = now
+        if self.max_requests_per_minute:
+            self._available_requests = min(
+                self.max_requests_per_minute,
+                self._available_requests + self.max_requests_per_minute * elapsed / 60
+            )
+        if self.max_tokens_per_minute:
+            self._available_tokens = min(
+                self.max_tokens_per_minute,
+                self._available_tokens + self.max_tokens_per_minute * elapsed / 60
+            )
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until one request and the given number of tokens are available, then consume them."""
+        async with self._lock:
+            if self.max_tokens_per_minute:
+                # A single request larger than the whole budget would otherwise wait forever
+                tokens = min(tokens, self.max_tokens_per_minute)
+            while True:
+                self._refill()
+                wait = 0.0
+                if self.max_requests_per_minute and self._available_requests < 1:
+                    wait = max(wait, (1 - self._available_requests) * 60 / self.max_requests_per_minute)
+                if self.max_tokens_per_minute and self._available_tokens < tokens:
+                    wait = max(wait, (tokens - self._available_tokens) * 60 / self.max_tokens_per_minute)
+                if wait <= 0:
+                    break
+                logger.debug("Rate limit reached, waiting %.2f seconds", wait)
+                await asyncio.sleep(wait)
+
+            if self.max_requests_per_minute:
+                self._available_requests -= 1
+            if self.max_tokens_per_minute:
+                self._available_tokens -= tokens
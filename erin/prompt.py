@@ -1,12 +1,20 @@
+import functools
 import logging
 import inspect
-from typing import List, Tuple, Any, Dict
+import threading
+from typing import List, Tuple, Any, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
 # Maximum parameter value string length, values exceeding this will be simplified or skipped
 MAX_PARAM_VALUE_LENGTH = 200
 
+# Maximum total length of formatted non-scalar parameter values sent to the model,
+# larger values are left out of the prompt to save tokens
+MAX_PARAMETER_VALUES_LENGTH = 200
+
+_SCALAR_TYPES = (type(None), bool, int, float, str)
+
 PROMPT = """
 You are a Python function synthesizer named Erin. You will receive a function name and parameter types, and you must infer the most plausible behavior from the name and types, then implement the function in Python.
 
@@ -75,134 +83,181 @@ parameter_values:
 {parameter_values}
 """
 
+
+def _split_template(template: str, *fields: str) -> Tuple[str, ...]:
+    """
+    Split a template into the literal chunks around the given {field} placeholders.
+    Fields must appear in the template in the given order, each exactly once.
+    """
+    chunks = []
+    rest = template
+    for field in fields:
+        chunk, rest = rest.split("{" + field + "}", 1)
+        chunks.append(chunk)
+    chunks.append(rest)
+    return tuple(chunks)
+
+
+# PROMPT pre-split once at import, so formatting is a plain join instead of re-parsing the template
+_C0, _C1, _C2, _C3, _C4 = _split_template(
+    PROMPT, "function_name", "optional_context", "parameters", "parameter_values"
+)
+
+
+@functools.singledispatch
+def _format_value(value: Any, visited: set) -> str:
+    """Format a value by type; this default handles custom objects and other types."""
+    # Handle custom objects
+    obj_structure = format_object_structure(value, visited)
+    if obj_structure:
+        return obj_structure
+
+    # Other types, try to convert to string
+    value_str = str(value)
+    if len(value_str) > MAX_PARAM_VALUE_LENGTH:
+        return f"{value_str[:100]}... (truncated, type: {type(value).__name__})"
+    return value_str
+
+
+@_format_value.register(type(None))
+def _format_none(value: Any, visited: set) -> str:
+    return "None"
+
+
+@_format_value.register(str)
+def _format_str(value: str, visited: set) -> str:
+    if len(value) > MAX_PARAM_VALUE_LENGTH:
+        return f'"{value[:100]}..." (truncated, total length: {len(value)})'
+    return repr(value)
+
+
+@_format_value.register(int)
+@_format_value.register(float)
+def _format_number(value: Any, visited: set) -> str:
+    return repr(value)
+
+
+@_format_value.register(list)
+def _format_list(value: list, visited: set) -> str:
+    if len(value) > 20:  # List too long, simplify
+        if len(str(value)) > MAX_PARAM_VALUE_LENGTH:
+            return f"[{format_param_value(value[0], visited) if value else '...'}, ...] (list with {len(value)} items)"
+        # Try to show first few elements
+        preview = []
+        for item in value[:3]:
+            item_str = format_param_value(item, visited)
+            preview.append(item_str if item_str else "...")
+        return f"[{', '.join(preview)}, ...] (list with {len(value)} items)"
+    else:
+        items = []
+        # Length of ', '.join(items), tracked incrementally (no separator before the first item)
+        joined_len = -2
+        for item in value:
+            item_str = format_param_value(item, visited)
+            if item_str and len(item_str) < 100:
+                items.append(item_str)
+            else:
+                items.append("...")
+            joined_len += len(items[-1]) + 2
+            if joined_len > MAX_PARAM_VALUE_LENGTH:
+                items.append("...")
+                break
+        result = f"[{', '.join(items)}]"
+        if len(result) > MAX_PARAM_VALUE_LENGTH:
+            return f"[...] (list with {len(value)} items, too long to display)"
+        return result
+
+
+@_format_value.register(dict)
+def _format_dict(value: dict, visited: set) -> str:
+    if len(value) > 10:  # Dictionary too large, simplify
+        preview_items = []
+        for i, (k, v) in enumerate(value.items()):
+            if i >= 3:
+                break
+            key_str = format_param_value(k, visited)
+            val_str = format_param_value(v, visited)
+            if key_str and val_str and len(key_str) + len(val_str) < 150:
+                preview_items.append(f"{key_str}: {val_str}")
+            else:
+                preview_items.append("...")
+        return f"{{{', '.join(preview_items)}, ...}} (dict with {len(value)} items)"
+    else:
+        items = []
+        # Length of '{' + ', '.join(items) + '}', tracked incrementally
+        joined_len = 0
+        for k, v in value.items():
+            key_str = format_param_value(k, visited)
+            val_str = format_param_value(v, visited)
+            if key_str and val_str and len(key_str) + len(val_str) < 150:
+                items.append(f"{key_str}: {val_str}")
+            else:
+                items.append("...")
+            joined_len += len(items[-1]) + 2
+            if joined_len > MAX_PARAM_VALUE_LENGTH:
+                items.append("...")
+                break
+        result = f"{{{', '.join(items)}}}"
+        if len(result) > MAX_PARAM_VALUE_LENGTH:
+            return f"{{...}} (dict with {len(value)} items, too long to display)"
+        return result
+
+
+@_format_value.register(tuple)
+def _format_tuple(value: tuple, visited: set) -> str:
+    if len(value) > 10:
+        preview = []
+        for item in value[:3]:
+            item_str = format_param_value(item, visited)
+            preview.append(item_str if item_str else "...")
+        return f"({', '.join(preview)}, ...) (tuple with {len(value)} items)"
+    items = []
+    for item in value:
+        item_str = format_param_value(item, visited)
+        items.append(item_str if item_str else "...")
+    result = f"({', '.join(items)})"
+    if len(result) > MAX_PARAM_VALUE_LENGTH:
+        return f"(...) (tuple with {len(value)} items, too long to display)"
+    return result
+
+
+# Per-thread visited set reused by top-level formatting calls instead of allocating one each time
+_tls = threading.local()
+
+
+def _visited_set() -> set:
+    """Return this thread's shared visited set; entries are always removed before formatting returns."""
+    visited = getattr(_tls, "visited", None)
+    if visited is None:
+        visited = _tls.visited = set()
+    return visited
+
+
 def format_param_value(value: Any, visited: set = None) -> str:
     """
     Format parameter value, handling overly long values and object structures.
     Returns formatted string, or None if value is too long or cannot be formatted.
     """
     if visited is None:
-        visited = set()
+        visited = _visited_set()
 
     # Check for circular reference using object id
     obj_id = id(value)
     if obj_id in visited:
         return "... (circular reference)"
 
-    # Add to visited set for mutable types (lists, dicts, custom objects)
+    # Add to visited set for lists and dicts; custom objects are tracked by format_object_structure.
     # For immutable types (str, int, float, bool, tuple), we don't need to track
     # but we still check to avoid issues with tuples containing mutable objects
-    is_mutable = isinstance(value, (list, dict)) or (
-        hasattr(value, '__class__') and
-        value.__class__.__module__ != 'builtins' and
-        not isinstance(value, (str, int, float, bool, tuple))
-    )
+    is_mutable = isinstance(value, (list, dict))
 
     if is_mutable:
         visited.add(obj_id)
 
     try:
-        # Handle None
-        if value is None:
-            return "None"
-
-        # Handle strings
-        if isinstance(value, str):
-            if len(value) > MAX_PARAM_VALUE_LENGTH:
-                return f'"{value[:100]}..." (truncated, total length: {len(value)})'
-            return repr(value)
-
-        # Handle numbers and booleans
-        if isinstance(value, (int, float, bool)):
-            return repr(value)
-
-        # Handle lists
-        if isinstance(value, list):
-            if len(value) > 20:  # List too long, simplify
-                if len(str(value)) > MAX_PARAM_VALUE_LENGTH:
-                    return f"[{format_param_value(value[0], visited) if value else '...'}, ...] (list with {len(value)} items)"
-                # Try to show first few elements
-                preview = []
-                for item in value[:3]:
-                    item_str = format_param_value(item, visited)
-                    preview.append(item_str if item_str else "...")
-                return f"[{', '.join(preview)}, ...] (list with {len(value)} items)"
-            else:
-                items = []
-                for item in value:
-                    item_str = format_param_value(item, visited)
-                    if item_str and len(item_str) < 100:
-                        items.append(item_str)
-                    else:
-                        items.append("...")
-                    if len(', '.join(items)) > MAX_PARAM_VALUE_LENGTH:
-                        items.append("...")
-                        break
-                result = f"[{', '.join(items)}]"
-                if len(result) > MAX_PARAM_VALUE_LENGTH:
-                    return f"[...] (list with {len(value)} items, too long to display)"
-                return result
-
-        # Handle dictionaries
-        if isinstance(value, dict):
-            if len(value) > 10:  # Dictionary too large, simplify
-                preview_items = []
-                for i, (k, v) in enumerate(value.items()):
-                    if i >= 3:
-                        break
-                    key_str = format_param_value(k, visited)
-                    val_str = format_param_value(v, visited)
-                    if key_str and val_str and len(key_str) + len(val_str) < 150:
-                        preview_items.append(f"{key_str}: {val_str}")
-                    else:
-                        preview_items.append("...")
-                return f"{{{', '.join(preview_items)}, ...}} (dict with {len(value)} items)"
-            else:
-                items = []
-                for k, v in value.items():
-                    key_str = format_param_value(k, visited)
-                    val_str = format_param_value(v, visited)
-                    if key_str and val_str and len(key_str) + len(val_str) < 150:
-                        items.append(f"{key_str}: {val_str}")
-                    else:
-                        items.append("...")
-                    if len('{' + ', '.join(items) + '}') > MAX_PARAM_VALUE_LENGTH:
-                        items.append("...")
-                        break
-                result = f"{{{', '.join(items)}}}"
-                if len(result) > MAX_PARAM_VALUE_LENGTH:
-                    return f"{{...}} (dict with {len(value)} items, too long to display)"
-                return result
-
-        # Handle tuples
-        if isinstance(value, tuple):
-            if len(value) > 10:
-                preview = []
-                for item in value[:3]:
-                    item_str = format_param_value(item, visited)
-                    preview.append(item_str if item_str else "...")
-                return f"({', '.join(preview)}, ...) (tuple with {len(value)} items)"
-            items = []
-            for item in value:
-                item_str = format_param_value(item, visited)
-                items.append(item_str if item_str else "...")
-            result = f"({', '.join(items)})"
-            if len(result) > MAX_PARAM_VALUE_LENGTH:
-                return f"(...) (tuple with {len(value)} items, too long to display)"
-            return result
-
-        # Handle custom objects
-        obj_structure = format_object_structure(value, visited)
-        if obj_structure:
-            return obj_structure
-
-        # Other types, try to convert to string
-        value_str = str(value)
-        if len(value_str) > MAX_PARAM_VALUE_LENGTH:
-            return f"{value_str[:100]}... (truncated, type: {type(value).__name__})"
-        return value_str
-
+        return _format_value(value, visited)
     except Exception as e:
-        logger.debug(f"Error formatting param value: {e}")
+        logger.debug("Error formatting param value: %s", e)
         return None
     finally:
         # Remove from visited set only if we added it
@@ -210,13 +265,37 @@ def format_param_value(value: Any, visited: set = None) -> str:
             visited.discard(obj_id)
 
 
+def _instance_attributes(obj: Any):
+    """
+    Yield (name, value) pairs of an object's own attributes.
+    Reads __dict__ directly rather than dir(), so inherited members and properties are not touched;
+    objects without __dict__ fall back to their __slots__.
+    """
+    try:
+        yield from vars(obj).items()
+        return
+    except TypeError:
+        pass
+
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for key in slots:
+            try:
+                yield key, getattr(obj, key)
+            except AttributeError:
+                # Slot declared but never assigned
+                pass
+
+
 def format_object_structure(obj: Any, visited: set = None) -> str:
     """
     Format object structure, returning structure definition and example values.
     For custom objects, extract their attributes and example values.
     """
     if visited is None:
-        visited = set()
+        visited = _visited_set()
 
     obj_id = id(obj)
     if obj_id in visited:
@@ -229,16 +308,16 @@ def format_object_structure(obj: Any, visited: set = None) -> str:
             class_name = obj.__class__.__name__
             module_name = obj.__class__.__module__
 
-            # Get all attributes
+            # Get instance attributes
             attrs = {}
-            for key in dir(obj):
+            for key, value in _instance_attributes(obj):
                 if not key.startswith('_'):
-                    try:
-                        value = getattr(obj, key)
-                        if not inspect.ismethod(value) and not inspect.isfunction(value):
-                            attrs[key] = value
-                    except:
-                        pass
+                    if not inspect.ismethod(value) and not inspect.isfunction(value):
+                        attrs[key] = value
+
+            if not attrs:
+                # Types without public instance attributes (date, Decimal, Path, ...) read better as str()
+                return None
 
             # Format attribute example values
             attr_examples = []
@@ -258,28 +337,77 @@ def format_object_structure(obj: Any, visited: set = None) -> str:
         else:
             return None
     except Exception as e:
-        logger.debug(f"Error formatting object structure: {e}")
+        logger.debug("Error formatting object structure: %s", e)
         return None
     finally:
         visited.discard(obj_id)
 
 
+def format_parameter_values(
+    parameter_values: List[Tuple[str, Any]],
+    max_length: int = None
+) -> Optional[List[Tuple[str, Optional[str]]]]:
+    """
+    Format each parameter value once, returning (param_name, formatted_value) pairs.
+    With max_length, returns None as soon as the non-scalar values add up to max_length characters,
+    meaning they are not worth their tokens in the prompt. Scalars are always kept.
+    """
+    all_scalars = max_length is None or all(isinstance(value, _SCALAR_TYPES) for _, value in parameter_values)
+
+    formatted_values = []
+    total_length = 0
+    for param_name, param_value in parameter_values:
+        formatted_value = format_param_value(param_value)
+        formatted_values.append((param_name, formatted_value))
+        if not all_scalars and not isinstance(param_value, _SCALAR_TYPES):
+            total_length += len(formatted_value) if formatted_value else 0
+            if total_length >= max_length:
+                return None
+    return formatted_values
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_prompt_head(
+    function_name: str,
+    parameters: Tuple[Tuple[str, str], ...],
+    optional_context: str = None
+) -> str:
+    """Render the part of the prompt before parameter_values, which only depends on hashable inputs."""
+    params_str = "\n".join([f"    {param_name}: {param_type}" for param_name, param_type in parameters])
+
+    context_str = ""
+    if optional_context:
+        context_str = f"optional_context: {optional_context}"
+
+    return "".join((
+        _C0, function_name,
+        _C1, context_str,
+        _C2, params_str,
+        _C3
+    ))
+
+
 def format_prompt(
     function_name: str,
     parameters: List[Tuple[str, str]],
     parameter_values: List[Tuple[str, Any]] = None,
-    optional_context: str = None
+    optional_context: str = None,
+    formatted_values: List[Tuple[str, Optional[str]]] = None
 ) -> str:
-    logger.debug(f"Formatting prompt: function_name={function_name}, parameters={parameters}, parameter_values={parameter_values}, optional_context={optional_context}")
+    """
+    Render the generation prompt. Pass formatted_values from format_parameter_values
+    instead of parameter_values to avoid formatting the values a second time.
+    """
+    logger.debug("Formatting prompt: function_name=%s, parameters=%s, parameter_values=%s, optional_context=%s", function_name, parameters, parameter_values, optional_context)
 
-    params_str = "\n".join([f"    {param_name}: {param_type}" for param_name, param_type in parameters])
+    if formatted_values is None and parameter_values:
+        formatted_values = format_parameter_values(parameter_values)
 
     # Format parameter values
     param_values_str = ""
-    if parameter_values:
+    if formatted_values:
         value_lines = []
-        for param_name, param_value in parameter_values:
-            formatted_value = format_param_value(param_value)
+        for param_name, formatted_value in formatted_values:
             if formatted_value:
                 # If value is multi-line (e.g., object structure), need proper indentation
                 if '\n' in formatted_value:
@@ -294,16 +422,8 @@ def format_prompt(
     else:
         param_values_str = "    (no example values provided)"
 
-    context_str = ""
-    if optional_context:
-        context_str = f"optional_context: {optional_context}"
-
-    formatted = PROMPT.format(
-        function_name=function_name,
-        parameters=params_str,
-        parameter_values=param_values_str,
-        optional_context=context_str
-    )
+    head = _format_prompt_head(function_name, tuple(parameters), optional_context)
+    formatted = "".join((head, param_values_str, _C4))
 
-    logger.debug(f"Prompt formatting completed, total length: {len(formatted)} characters")
+    logger.debug("Prompt formatting completed, total length: %s characters", len(formatted))
     return formatted